@@ -16,18 +16,38 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import json
 import logging
 import os
+import re
 import subprocess
+import sys
+from array import array
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
+try:
+    import amdsmi
+except ImportError:
+    amdsmi = None
 
 _ROCM_PATH = os.environ.get("ROCM_PATH", "/opt/rocm")
 _RSMI_BIN = f"{_ROCM_PATH}/bin/rocm-smi"
 
 
 _RSMI_GPU_IDENTIFIER_PATTERN = "card"
+_RSMI_GPU_KEY_RE = re.compile(rf"^{_RSMI_GPU_IDENTIFIER_PATTERN}\d+$")
+_RSMI_LINK_TYPE_RE = re.compile(
+    r"\(topology\) link type between drm devices (\d+) and (\d+)$"
+)
+_RSMI_LINK_TYPE_MAP = {"PCIE": 0, "XGMI": 1}
+_LSCPU_NODE_CPU_RE = re.compile(rb"^(\d+),(\d+)", re.MULTILINE)
 _GRES_FIELDS_ORDER = [
     "NodeName",
     "Name",
@@ -61,72 +81,209 @@ logger = logging.getLogger(__name__)
 
 def _merge_dicts(*dicts):
     """
-    Merges multiple dictionaries into a single dictionary by combining values of
-    corresponding keys.
+    Merges multiple dictionaries into a single dictionary of columns, where
+    each field found in the values of the input dictionaries is mapped to the
+    list of its values (ordered as the keys of the first input dictionary).
 
     Args:
         *dicts: Variable number of dictionaries to merge.
 
     Returns:
-        dict: Merged dictionary with values combined from corresponding keys
-        across input dictionaries.
+        defaultdict: Dictionary where keys are field names and values are lists
+        holding the field value of each key of the input dictionaries.
+
+    Raises:
+        KeyError: If a key or a field is missing from one of the dictionaries,
+        which would otherwise misalign the lists.
     """
-    keys = dicts[0].keys()
-    return {key: {k: v for d in dicts for k, v in d[key].items()} for key in keys}
+    keys = list(dicts[0])
+    res = defaultdict(list)
+    for d in dicts:
+        for field in next(iter(d.values()), {}):
+            res[field] = [d[key][field] for key in keys]
+    return res
 
 
 def _dict_set_keys_to_lower(input):
     """
-    Recursively converts all keys in a dictionary to lowercase.
+    Converts the keys of a dictionary and of its nested dictionaries to
+    lowercase. Only the first two levels are processed, as deeper ones are never
+    read from 'rocm-smi' output.
 
     Args:
-        input (dict): The dictionary to process. This can include nested
-        dictionaries and lists.
+        input (dict): The dictionary to process.
 
     Returns:
-        dict: A new dictionary with all string keys converted to lowercase.
+        dict: A new dictionary with the first two levels of keys converted to
+        lowercase.
     """
-
-    if isinstance(input, dict):
-        new_dict = {}
-        for key, value in input.items():
-            new_key = key.lower() if isinstance(key, str) else key
-            new_dict[new_key] = _dict_set_keys_to_lower(value)
-        return new_dict
-    elif isinstance(input, list):
-        return [_dict_set_keys_to_lower(item) for item in input]
-    else:
-        return input
+    return {
+        key.lower(): (
+            {k.lower(): v for k, v in val.items()} if isinstance(val, dict) else val
+        )
+        for key, val in input.items()
+    }
 
 
-def _call_json_cmd(cmd):
+def _call_json_cmd(argv):
     """
-    Executes a shell command and parses its JSON output.
+    Executes a command and parses its JSON output.
 
     Args:
-        cmd (str): The command to be executed.
+        argv (list): The command to be executed and its arguments.
 
     Returns:
         dict: The JSON output of the command parsed into a dictionary.
     """
-    return json.loads(subprocess.check_output(cmd, shell=True).decode())
+    return _json.loads(subprocess.run(argv, stdout=subprocess.PIPE, check=True).stdout)
 
 
-def _rocm_smi_get_file():
+def _rsmi_get_all():
     """
-    Retrieves the device file path of each available GPU by using 'rocm-smi'
-    tool.
+    Retrieves all the GPU information required to build 'gres.conf' lines with
+    a single 'rocm-smi' call.
 
     Returns:
-        dict: A dictionary where keys are GPU identifiers and each associated
-        value is a dictionary of this form {'File': '/dev/dri/renderD130'}
+        tuple: The combined JSON output of 'rocm-smi' where all keys are cast to
+        lower case, and the flat link types matrix returned by
+        _rocm_smi_get_links().
     """
-    rsmi_dict = _call_json_cmd(f"{_RSMI_BIN} --showbus --json")
+    rsmi_dict = _call_json_cmd(
+        [
+            _RSMI_BIN,
+            "--showbus",
+            "--showproductname",
+            "--showuniqueid",
+            "--showserial",
+            "--showtopo",
+            "--showtoponuma",
+            "--json",
+        ]
+    )
+
+    # Cast all key to lower case
     rsmi_dict = _dict_set_keys_to_lower(rsmi_dict)
+    return rsmi_dict, _rocm_smi_get_links(rsmi_dict)
 
+
+def _amdsmi_get_all():
+    """
+    Retrieves all the GPU information required to build 'gres.conf' lines by
+    using the 'amdsmi' Python bindings, which avoids spawning 'rocm-smi'.
+
+    Returns:
+        tuple: A dictionary with the same layout as the lower cased 'rocm-smi'
+        output, and the flat link types matrix of the GPUs.
+    """
+    link_type_map = {
+        amdsmi.AmdSmiIoLinkType.PCIEXPRESS: 0,
+        amdsmi.AmdSmiIoLinkType.XGMI: 1,
+    }
+
+    amdsmi.amdsmi_init()
+    try:
+        handles = amdsmi.amdsmi_get_processor_handles()
+
+        res = {}
+        for idx, handle in enumerate(handles):
+            asic_info = amdsmi.amdsmi_get_gpu_asic_info(handle)
+            board_info = amdsmi.amdsmi_get_gpu_board_info(handle)
+
+            # Normalizing values to 'rocm-smi' format, as 'Type' and 'UUID' of
+            # 'gres.conf' lines must not depend on the backend:
+            # - market name may be prefixed by vendor (eg. "AMD Instinct MI210")
+            #   while 'rocm-smi' card series is not (eg. "Instinct MI210")
+            # - ASIC serial may be zero padded or upper cased while 'rocm-smi'
+            #   unique id is formatted as '0x%x'
+            card_serie = asic_info["market_name"].strip()
+            if card_serie.startswith("AMD "):
+                card_serie = card_serie[len("AMD ") :]
+            unique_id = asic_info["asic_serial"]
+            try:
+                unique_id = hex(int(unique_id, 16))
+            except ValueError:
+                # Keep raw value when not an hexadecimal number (eg. "N/A")
+                pass
+
+            res[f"{_RSMI_GPU_IDENTIFIER_PATTERN}{idx}"] = {
+                "pci bus": amdsmi.amdsmi_get_gpu_device_bdf(handle),
+                "card series": card_serie,
+                "unique id": unique_id,
+                "serial number": board_info["product_serial"],
+                "(topology) numa node": str(
+                    amdsmi.amdsmi_topo_get_numa_node_number(handle)
+                ),
+            }
+
+        # Building the flat link types matrix directly from integer values
+        nb_gpu = len(handles)
+        links = array("i", [-1]) * (nb_gpu * nb_gpu)
+        for i, src in enumerate(handles):
+            for j in range(i + 1, nb_gpu):
+                link = amdsmi.amdsmi_topo_get_link_type(src, handles[j])
+                links[i * nb_gpu + j] = links[j * nb_gpu + i] = link_type_map.get(
+                    link["type"], 0
+                )
+    finally:
+        amdsmi.amdsmi_shut_down()
+
+    return res, links
+
+
+def _check_rsmi_bin():
+    """
+    Checks that 'rocm-smi' binary exists, otherwise prints how to set it up and
+    exits.
+    """
+    if not os.path.exists(_RSMI_BIN):
+        print(f"Binary file '{_RSMI_BIN}' does not exist.")
+        print(
+            "Please set ROCM_PATH environment variable to the proper installation path of ROCm"
+        )
+        print("Example: export ROCM_PATH=/opt/rocm")
+        sys.exit(-1)
+
+
+def _gpu_get_all():
+    """
+    Retrieves all the GPU information required to build 'gres.conf' lines by
+    using the 'amdsmi' Python bindings when available, and falls back to
+    'rocm-smi' tool otherwise or if 'amdsmi' fails at runtime.
+
+    Returns:
+        tuple: A dictionary with the layout of the lower cased 'rocm-smi'
+        output, and the flat link types matrix of the GPUs.
+    """
+    if amdsmi is not None:
+        try:
+            res = _amdsmi_get_all()
+            logger.info("GPU information retrieved with 'amdsmi' library")
+            return res
+        except amdsmi.AmdSmiException as e:
+            logger.warning(f"'amdsmi' library failed ({e}), using '{_RSMI_BIN}'")
+
+    _check_rsmi_bin()
+    res = _rsmi_get_all()
+    logger.info(f"GPU information retrieved with '{_RSMI_BIN}'")
+    return res
+
+
+def _rocm_smi_get_file(rsmi_dict):
+    """
+    Retrieves the device file path of each available GPU from 'rocm-smi'
+    output.
+
+    Args:
+        rsmi_dict (dict): The lower cased 'rocm-smi' output (or its 'amdsmi'
+        equivalent) returned by _gpu_get_all().
+
+    Returns:
+        dict: A dictionary where keys are GPU identifiers and each associated
+        value is a dictionary of this form {'File': '/dev/dri/renderD130'}
+    """
     res = {}
     for key, val in rsmi_dict.items():
-        if _RSMI_GPU_IDENTIFIER_PATTERN in key:
+        if _RSMI_GPU_KEY_RE.match(key):
             # Getting PCI Bus
             pci_bus = val.get("pci bus")
             assert pci_bus is not None
@@ -134,31 +291,35 @@ def _rocm_smi_get_file():
             # Building device 'by-path' symlink using PCI Bus value
             path = f"/dev/dri/by-path/pci-{pci_bus.lower()}-render"
 
-            # Find device file path through symlink
-            path = f"/dev/dri/{(os.path.basename(os.readlink(path)))}"
+            # Find device file path by resolving the symlink target against
+            # its directory (raises if the symlink does not exist)
+            path = os.path.normpath(
+                os.path.join(os.path.dirname(path), os.readlink(path))
+            )
             res[key] = {"File": path}
 
     return res
 
 
-def _rocm_smi_get_type():
+def _rocm_smi_get_type(rsmi_dict):
     """
-    Retrieves the card serie type of each available GPU by using 'rocm-smi'
-    tool. Card serie type are then mapped to short name (eg. "Instinct MI100" ->
-    "mi100").
+    Retrieves the card serie type of each available GPU from 'rocm-smi'
+    output. Card serie type are then mapped to short name (eg. "Instinct MI100"
+    -> "mi100").
+
+    Args:
+        rsmi_dict (dict): The lower cased 'rocm-smi' output (or its 'amdsmi'
+        equivalent) returned by _gpu_get_all().
 
     Returns:
         dict: A dictionary where keys are GPU identifiers and each associated
         value is a dictionary of this form  {'Type': 'mi210'}
 
     """
-    rsmi_dict = _call_json_cmd(f"{_RSMI_BIN} --showproductname --json")
-    rsmi_dict = _dict_set_keys_to_lower(rsmi_dict)
-
     res = {}
     for key, val in rsmi_dict.items():
         # Filter keys by using GPU identifier pattern
-        if _RSMI_GPU_IDENTIFIER_PATTERN in key:
+        if _RSMI_GPU_KEY_RE.match(key):
             card_serie = val.get("card series")
             assert card_serie is not None
 
@@ -171,21 +332,22 @@ def _rocm_smi_get_type():
     return res
 
 
-def _rocm_smi_get_uuid():
+def _rocm_smi_get_uuid(rsmi_dict):
     """
-    Retrieves the UUID of each available GPU by using 'rocm-smi' tool.
+    Retrieves the UUID of each available GPU from 'rocm-smi' output.
+
+    Args:
+        rsmi_dict (dict): The lower cased 'rocm-smi' output (or its 'amdsmi'
+        equivalent) returned by _gpu_get_all().
 
     Returns:
         dict: A dictionary where keys are GPU identifiers and each associated
         value is a dictionary of this form  {'UUID': '0x9d9d841980e9a221'}
     """
-    rsmi_dict = _call_json_cmd(f"{_RSMI_BIN} --showuniqueid --json")
-    rsmi_dict = _dict_set_keys_to_lower(rsmi_dict)
-
     res = {}
     for key, val in rsmi_dict.items():
         # Filter keys by using GPU identifier pattern
-        if _RSMI_GPU_IDENTIFIER_PATTERN in key:
+        if _RSMI_GPU_KEY_RE.match(key):
             uuid = val.get("unique id")
             assert uuid is not None
             res[key] = {"UUID": uuid}
@@ -193,23 +355,22 @@ def _rocm_smi_get_uuid():
     return res
 
 
-def _rocm_smi_get_serial():
+def _rocm_smi_get_serial(rsmi_dict):
     """
-    Retrieves the serial number of each available GPU by using 'rocm-smi' tool.
+    Retrieves the serial number of each available GPU from 'rocm-smi' output.
+
+    Args:
+        rsmi_dict (dict): The lower cased 'rocm-smi' output (or its 'amdsmi'
+        equivalent) returned by _gpu_get_all().
 
     Returns:
         dict: A dictionary where keys are GPU identifiers and each associated
         value is a dictionary of this form  {'UUID': '0x9d9d841980e9a221'}
     """
-    rsmi_dict = _call_json_cmd(f"{_RSMI_BIN} --showserial --json")
-
-    # Cast all key to lower case
-    rsmi_dict = _dict_set_keys_to_lower(rsmi_dict)
-
     res = {}
     for key, val in rsmi_dict.items():
         # Filter keys by using GPU identifier pattern
-        if _RSMI_GPU_IDENTIFIER_PATTERN in key:
+        if _RSMI_GPU_KEY_RE.match(key):
             # Getting serial
             serial = val.get("serial number")
             assert serial is not None
@@ -219,58 +380,76 @@ def _rocm_smi_get_serial():
     return res
 
 
-def _rocm_smi_get_links():
+def _rocm_smi_get_links(rsmi_dict):
     """
-    Retrieves the device to device topology of each available GPU by using
-    'rocm-smi' tool.
+    Retrieves the device to device topology of each available GPU from
+    'rocm-smi' output.
+
+    Args:
+        rsmi_dict (dict): The lower cased 'rocm-smi' output.
 
     Returns:
-        dict: A dictionary where keys are GPU identifiers and each associated
-        value is a dictionary of this form  {'Links': ['-1', '0', '1', '0',...]}
+        array: A flat nb_gpu x nb_gpu matrix where the value at index
+        i * nb_gpu + j is the link type between GPU_i and GPU_j.
 
     Link values:
         -1: link between a GPU and itself
-         0: PCIE link between two GPU
+         0: PCIE (or unknown) link between two GPU
          1: XGMI link between two GPU
     """
-    rsmi_dict = _call_json_cmd(f"{_RSMI_BIN} --showtopo --json")
-    rsmi_dict = _dict_set_keys_to_lower(rsmi_dict)
-
     # Getting GPU count
-    nb_gpu = len([k for k in rsmi_dict.keys() if _RSMI_GPU_IDENTIFIER_PATTERN in k])
+    nb_gpu = len([k for k in rsmi_dict.keys() if _RSMI_GPU_KEY_RE.match(k)])
 
-    # Initializing "Links" to a list where values are all equal to "-1"
-    res = {
-        f"{_RSMI_GPU_IDENTIFIER_PATTERN}{k}": {"Links": (nb_gpu) * ["-1"]}
-        for k in range(nb_gpu)
-    }
+    # Initializing link types to -1
+    links = array("i", [-1]) * (nb_gpu * nb_gpu)
 
-    # For each value of i and j we try to fetch the json data for a match
+    # Single pass over the json data looking for GPU_i -> GPU_j link types
     # Warning: rocm-smi only outputs GPU_i -> GPU_j links never the symetrical
     # ones GPU_j -> GPU_i
-    tag = "(topology) link type between drm devices {i} and {j}"
-    for i in range(nb_gpu):
-        for j in range(nb_gpu):
-            # Read GPU_i->GPU_j association (if present)
-            link_ij = (
-                rsmi_dict.get("system")
-                .get(tag.format(i=i, j=j), "")
-                .replace("PCIE", "0")
-                .replace("XGMI", "1")
-            )
+    for key, val in rsmi_dict.get("system", {}).items():
+        match = _RSMI_LINK_TYPE_RE.match(key)
+        if match is None or val == "":
+            continue
+
+        # Ignore links involving devices that are not listed as GPU
+        i, j = int(match[1]), int(match[2])
+        if i >= nb_gpu or j >= nb_gpu:
+            continue
+
+        # Store GPU_i->GPU_j and GPU_j->GPU_i link type
+        links[i * nb_gpu + j] = links[j * nb_gpu + i] = _RSMI_LINK_TYPE_MAP.get(
+            val, 0
+        )
 
-            if link_ij != "":
-                # Store GPU_i->GPU_j link type
-                res[f"{_RSMI_GPU_IDENTIFIER_PATTERN}{i}"]["Links"][j] = link_ij
-                # Store GPU_j->GPU_i link type
-                res[f"{_RSMI_GPU_IDENTIFIER_PATTERN}{j}"]["Links"][i] = link_ij
+    return links
 
-    return res
+
+def _links_to_dict(links, nb_gpu):
+    """
+    Splits a flat link types matrix into the 'Links' value of each GPU.
+
+    Args:
+        links (array): The flat nb_gpu x nb_gpu link types matrix.
+        nb_gpu (int): The number of GPU.
+
+    Returns:
+        dict: A dictionary where keys are GPU identifiers and each associated
+        value is a dictionary of this form  {'Links': ['-1', '0', '1', '0',...]}
+    """
+    return {
+        f"{_RSMI_GPU_IDENTIFIER_PATTERN}{i}": {
+            "Links": [str(x) for x in links[i * nb_gpu : (i + 1) * nb_gpu]]
+        }
+        for i in range(nb_gpu)
+    }
 
 
+@lru_cache(maxsize=1)
 def _lscpu_get_numa_cpus():
     """
-    Retrieves the cpus of each available NUMA node by using 'lscpu' tool.
+    Retrieves the cpus of each available NUMA node by using 'lscpu' tool. The
+    result is cached, hence the returned dictionary is shared between callers
+    and must not be modified.
 
     Returns:
         dict: A dictionary where keys are NUMA node IDs and each associated
@@ -278,49 +457,52 @@ def _lscpu_get_numa_cpus():
         possible, incremental sequence is converted to range eg 1,2,3 -> '1-3'
 
     """
-    numa_data = subprocess.check_output(
-        "lscpu --parse=NODE,CPU",
-        shell=True,
-    ).decode()
+    numa_data = subprocess.run(
+        ["lscpu", "--parse=NODE,CPU"],
+        stdout=subprocess.PIPE,
+        check=True,
+    ).stdout
 
-    # Storing list of CPUs
+    # Storing list of CPUs (comment lines starting with '#' are not matched)
     res = defaultdict(list)
-    for line in numa_data.split("\n"):
-        if not line.startswith("#") and line != "":
-            data = line.split(",")
-            res[int(data[0])].append(int(data[1]))
+    for match in _LSCPU_NODE_CPU_RE.finditer(numa_data):
+        res[int(match[1])].append(int(match[2]))
 
     # Converting list of CPUs to range "cpu_min-cpu_max" if possible
     res = dict(res)
     for key, val in res.items():
-        cpu_min, cpu_max = min(val), max(val)
-        if set(val) == set(range(cpu_min, cpu_max + 1)):
+        val.sort()
+        cpu_min, cpu_max = val[0], val[-1]
+        if cpu_max - cpu_min + 1 == len(val) and all(
+            b - a == 1 for a, b in zip(val, val[1:])
+        ):
             res[key] = f"{cpu_min}-{cpu_max}"
         else:
-            res[key] = ",".join(sorted([str(v) for v in res[key]]))
+            res[key] = ",".join([str(v) for v in val])
     return res
 
 
-def _rocm_smi_get_cores():
+def _rocm_smi_get_cores(rsmi_dict, numa_to_cpus):
     """
-    Retrieves associated the cpus core of each available GPU by using 'rocm-smi'
-    tool.
+    Retrieves associated the cpus core of each available GPU from 'rocm-smi'
+    output.
+
+    Args:
+        rsmi_dict (dict): The lower cased 'rocm-smi' output (or its 'amdsmi'
+        equivalent) returned by _gpu_get_all().
+        numa_to_cpus (dict): The NUMA node to CPUs map returned by
+        _lscpu_get_numa_cpus().
+
     Returns:
         dict: A dictionary where keys are GPU identifiers and each associated
         value is a dictionary of this form  {'Cores': '1,2,3,4'}
         When possible, incremental sequence is converted to range eg '1,2,3' ->
         '1-3'
     """
-    rsmi_dict = _call_json_cmd(f"{_RSMI_BIN} --showtoponuma --json")
-    rsmi_dict = _dict_set_keys_to_lower(rsmi_dict)
-
-    # Getting NUMA to CPUs map (used to retrieve CPU)
-    numa_to_cpus = _lscpu_get_numa_cpus()
-
     res = {}
     for key, val in rsmi_dict.items():
         # Filter keys by using GPU identifier pattern
-        if _RSMI_GPU_IDENTIFIER_PATTERN in key:
+        if _RSMI_GPU_KEY_RE.match(key):
             numa_node = val.get("(topology) numa node", "")
             cores = numa_to_cpus.get(int(numa_node))
             res[key] = {"Cores": cores}
@@ -333,80 +515,78 @@ def get_gres_conf():
     Retrieves GPU resource configuration and prints slurm 'gres.conf' lines for
     each GPU.
     """
-    serial = _rocm_smi_get_serial()
-    uuid = _rocm_smi_get_uuid()
-    file = _rocm_smi_get_file()
-    links = _rocm_smi_get_links()
-    type = _rocm_smi_get_type()
-    cores = _rocm_smi_get_cores()
-
-    gres_dict = _merge_dicts(file, links, cores, type, uuid, serial)
-
-    # Add constant 'gres.conf' fields to each key of gres_dict
-    hostname = os.uname()[1].split(".")[0]
-    for key in gres_dict:
-        gres_dict[key].update(
-            {
-                "Name": "gpu",
-                "NodeName": hostname,
-                "Autodetect": "off",
-                "Count": 1,
-                "Flags": "amd_gpu_env",
-            }
-        )
+    # Fetching every rocm-smi data in one single call (through 'amdsmi' library
+    # when available), while concurrently getting NUMA to CPUs map (used to
+    # retrieve CPU) as both are I/O bound
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        rsmi_future = executor.submit(_gpu_get_all)
+        numa_future = executor.submit(_lscpu_get_numa_cpus)
+        rsmi_dict, link_types = rsmi_future.result()
+        numa_to_cpus = numa_future.result()
+
+    serial = _rocm_smi_get_serial(rsmi_dict)
+    uuid = _rocm_smi_get_uuid(rsmi_dict)
+    file = _rocm_smi_get_file(rsmi_dict)
+    links = _links_to_dict(link_types, len(file))
+    type = _rocm_smi_get_type(rsmi_dict)
+    cores = _rocm_smi_get_cores(rsmi_dict, numa_to_cpus)
+
+    # GPU data is stored as parallel lists (one per 'gres.conf' field)
+    gres = _merge_dicts(file, links, cores, type, uuid, serial)
+    nb_gpu = len(file)
+
+    # Add constant 'gres.conf' fields to gres
+    fqdn = os.uname()[1]
+    const_fields = {
+        "Name": "gpu",
+        "NodeName": fqdn.split(".")[0],
+        "Autodetect": "off",
+        "Count": 1,
+        "Flags": "amd_gpu_env",
+    }
+    for key, val in const_fields.items():
+        gres[key] = nb_gpu * [val]
 
     # In order to be constant among reboot and rocm versions we sort gathered
     # rocm-smi informations by using serial number.
-    gres_dict = dict(sorted(gres_dict.items(), key=lambda item: item[1]["Serial"]))
-
-    # Links value must be rearranged using the same permutation
-    for val in gres_dict.values():
-        val["Links"] = [
-            x
-            for _, x in sorted(
-                zip([val["Serial"] for val in serial.values()], val["Links"])
-            )
-        ]
-
-    # Converting "Links" to a sequence string
-    for val in gres_dict.values():
-        val["Links"] = ",".join(val["Links"])
+    perm = sorted(range(nb_gpu), key=gres["Serial"].__getitem__)
+    for key, val in gres.items():
+        gres[key] = [val[i] for i in perm]
 
+    # Links value must be rearranged using the same permutation and converted
+    # to a sequence string
+    gres["Links"] = [",".join([val[i] for i in perm]) for val in gres["Links"]]
 
     # Get the name of the current script
-    script_name = os.path.basename( os.path.abspath(__file__))
+    script_name = os.path.basename(os.path.abspath(__file__))
     date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(f"{80*'#'}")
-    print(f"# AMD GPU 'gres.conf' for host '{os.uname()[1]}'")
-    print(f"# Generated by {script_name} on {date}")
 
-    for idx, val in enumerate(gres_dict.values()):
+    # Output is accumulated and written at once
+    lines = [
+        f"{80*'#'}",
+        f"# AMD GPU 'gres.conf' for host '{fqdn}'",
+        f"# Generated by {script_name} on {date}",
+    ]
+    for idx in range(nb_gpu):
         # Assemble 'gres.conf' line comment
-        cmt = (
-            f"# GPU {idx} with uuid={val['UUID']} and serial={val['Serial']}"
+        lines.append(
+            f"# GPU {idx} with uuid={gres['UUID'][idx]} and "
+            f"serial={gres['Serial'][idx]}"
         )
-        print(cmt)
 
         # Assemble 'gres.conf' line
-        line = " ".join(
-            [
-                f"{subkey}={val[subkey]}"
+        lines.append(
+            " ".join(
+                f"{subkey}={subval}"
                 for subkey in _GRES_FIELDS_ORDER
-                if val.get(subkey) is not None
-            ]
+                if (subval := gres[subkey][idx]) is not None
+            )
         )
-        print(line)
+    lines.append(f"{80*'#'}")
+    sys.stdout.write("\n".join(lines) + "\n")
 
-    print(f"{80*'#'}")
 
 if __name__ == "__main__":
-    # Check if the binary file exists
-    if not os.path.exists(_RSMI_BIN):
-        print(f"Binary file '{_RSMI_BIN}' does not exist.")
-        print(
-            "Please set ROCM_PATH environment variable to the proper installation path of ROCm"
-        )
-        print("Example: export ROCM_PATH=/opt/rocm")
-        exit(-1)
-    else:
-        get_gres_conf()
+    # The 'rocm-smi' binary is checked only when it is actually needed, as it is
+    # not required when 'amdsmi' library is available
+    get_gres_conf()